@@ -0,0 +1,986 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Núcleo compartilhado pelos scripts de download de playlists de IPTV.
+
+Os scripts playlists.py e playlists.m3u.py apenas montam um dicionário de
+configuração (arquivos, diretório de saída, cabeçalhos, cache...) e chamam
+run(config); toda a lógica de download fica neste módulo.
+
+Funcionalidades:
+- Download paralelo, com uma thread por servidor e conexões reaproveitadas
+- Novas tentativas no pool de conexões, com backoff e jitter
+- Circuit breaker por servidor e cache de DNS em memória
+- Requisições condicionais (ETag/Last-Modified), quando há arquivo de cache
+- Validação do conteúdo conforme a extensão do arquivo
+- Hash MD5 calculado em uma thread separada
+"""
+
+import os
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+from hashlib import md5
+import logging
+import queue
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+import itertools
+import socket
+import threading
+import atexit
+import struct
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)  # Cria uma instância do logger
+
+# ==============================================
+# Configuração padrão
+# ==============================================
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}  # Cabeçalho HTTP para simular navegador
+DEFAULT_TIMEOUT = 10  # Tempo limite em segundos para requisições
+DEFAULT_RETRIES = 3  # Número de tentativas para cada download
+DEFAULT_BACKOFF = (
+    1.0  # Espera (em segundos) antes da 1ª nova tentativa; dobra a cada falha
+)
+RETRY_STATUS = (429, 500, 502, 503, 504)  # Códigos HTTP que justificam nova tentativa
+DEFAULT_MAX_WORKERS = 5  # Número máximo de threads paralelas
+BREAKER_THRESHOLD = 3  # Falhas seguidas que bloqueiam temporariamente um servidor
+BREAKER_COOLDOWN = 30  # Tempo (em segundos) que um servidor fica bloqueado
+MAX_BACKOFF = 30  # Tempo máximo de espera (em segundos) entre tentativas
+CHUNK_SIZE = 131072  # Tamanho dos blocos lidos da rede (128 KiB)
+VALID_SCHEMES = ("http://", "https://")  # Esquemas de URL aceitos
+# Assinaturas aceitas no início de um M3U (com ou sem BOM UTF-8)
+M3U_SIGNATURES = (b"#EXTM3U", b"\xef\xbb\xbf#EXTM3U")
+# Erros na leitura do corpo da resposta, que justificam uma nova requisição
+BODY_READ_ERRORS = (
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ReadTimeout,
+)
+HEAD_SIZE = 100  # Bytes do início do arquivo lidos antes de validar o conteúdo
+HASH_QUEUE_SIZE = 8  # Blocos aguardando hash (limita a memória usada pela fila)
+GZIP_MIN_SIZE = 18  # Cabeçalho GZIP (10 bytes) + trailer CRC32/ISIZE (8 bytes)
+
+# Estado do circuit breaker por servidor: {host: {"fails": int, "open_until": float}}
+_breaker: Dict[str, Dict[str, float]] = {}
+_breaker_lock = threading.Lock()
+
+# Fila e thread que calculam os hashes MD5 fora das threads de download
+_hash_queue: queue.Queue = queue.Queue(maxsize=HASH_QUEUE_SIZE)
+_hash_thread = None
+_hash_thread_lock = threading.Lock()
+
+# ==============================================
+# Classes de Exceção Personalizadas
+# ==============================================
+
+
+class DownloadError(Exception):
+    """Exceção para erros durante o download"""
+
+    pass
+
+
+class InvalidURLError(Exception):
+    """Exceção para URLs inválidas"""
+
+    pass
+
+
+class FileValidationError(Exception):
+    """Exceção para validação de arquivos"""
+
+    pass
+
+
+# ==============================================
+# Configuração do logging
+# ==============================================
+
+
+def setup_logging(log_file: str = "playlists.log", max_bytes: int = 0) -> None:
+    """
+    Configura o logging (arquivo + console) através de uma fila.
+
+    As mensagens vão para uma fila e são gravadas por uma thread separada
+    (QueueListener), para que a escrita do log não bloqueie os downloads.
+
+    Parâmetros:
+        log_file (str): Arquivo de log
+        max_bytes (int): Tamanho máximo do arquivo antes da rotação
+            (mantém 3 backups); 0 grava sempre no mesmo arquivo
+    """
+    log_format = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    if max_bytes:
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=3)
+    else:
+        file_handler = logging.FileHandler(log_file)
+    log_handlers = [file_handler, logging.StreamHandler()]
+    for handler in log_handlers:
+        handler.setFormatter(log_format)
+
+    log_queue: queue.Queue = queue.Queue()
+    log_listener = QueueListener(log_queue, *log_handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)  # Grava as mensagens pendentes ao encerrar
+
+    queue_handler = QueueHandler(log_queue)
+    # Apenas a mensagem: o formato final é aplicado pelos handlers acima
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.basicConfig(
+        level=logging.INFO,  # Nível mínimo de mensagens (INFO, WARNING, ERROR, CRITICAL)
+        handlers=[queue_handler],
+    )
+
+
+# ==============================================
+# Funções de validação
+# ==============================================
+
+
+def validate_url(url: str) -> bool:
+    """
+    Valida se a URL é válida e segura.
+
+    Parâmetros:
+        url (str): URL a ser validada
+
+    Retorna:
+        bool: True se a URL é válida, False caso contrário
+    """
+    return url.startswith(VALID_SCHEMES)
+
+
+def is_valid_m3u(content: bytes) -> bool:
+    """
+    Verifica se o conteúdo é um arquivo M3U válido.
+
+    Parâmetros:
+        content (bytes): Conteúdo do arquivo
+
+    Retorna:
+        bool: True se for M3U válido, False caso contrário
+    """
+    return content.startswith(M3U_SIGNATURES)
+
+
+def is_valid_xml_gz(content: bytes) -> bool:
+    """
+    Verifica se o conteúdo é um arquivo GZIP válido.
+
+    Parâmetros:
+        content (bytes): Conteúdo do arquivo
+
+    Retorna:
+        bool: True se for GZIP válido, False caso contrário
+    """
+    return content[:2] == b"\x1f\x8b"  # Assinatura magic number do GZIP
+
+
+def is_nonempty_gzip(file_path: str) -> bool:
+    """
+    Rejeita arquivos .gz pequenos demais ou declarados vazios.
+
+    Não é uma verificação de integridade: em um arquivo truncado os últimos
+    bytes são dados compactados quaisquer, então o campo ISIZE lido do
+    trailer não detecta o corte. Apenas arquivos com menos de GZIP_MIN_SIZE
+    bytes ou com ISIZE igual a 0 são recusados.
+
+    Parâmetros:
+        file_path (str): Caminho do arquivo
+
+    Retorna:
+        bool: False se o arquivo for pequeno demais ou vazio, True caso contrário
+    """
+    try:
+        with open(file_path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < GZIP_MIN_SIZE:
+                logger.error("Arquivo GZIP pequeno demais: %s", file_path)
+                return False
+            f.seek(-4, os.SEEK_END)
+            (isize,) = struct.unpack("<I", f.read(4))
+    except OSError as e:
+        logger.error("Erro ao ler arquivo GZIP %s: %s", file_path, e)
+        return False
+
+    # ISIZE é o tamanho do conteúdo descompactado (módulo 2^32)
+    if isize == 0:
+        logger.error("Arquivo GZIP sem conteúdo: %s", file_path)
+        return False
+    return True
+
+
+# Validadores do início do conteúdo recebido, por extensão do arquivo
+VALIDATORS: Dict[str, Callable[[bytes], bool]] = {
+    ".m3u": is_valid_m3u,
+    ".xml.gz": is_valid_xml_gz,
+}
+
+# Verificações do arquivo completo (já gravado), por extensão do arquivo
+FILE_CHECKS: Dict[str, Callable[[str], bool]] = {
+    ".xml.gz": is_nonempty_gzip,
+}
+
+
+def lookup_by_extension(save_path: str, table: Dict[str, Any]) -> Any:
+    """
+    Busca na tabela a entrada correspondente à extensão do arquivo.
+
+    A extensão composta (ex: '.xml.gz') tem prioridade sobre a simples
+    (ex: '.gz'); são no máximo duas consultas ao dicionário.
+
+    Parâmetros:
+        save_path (str): Caminho do arquivo
+        table (dict): Tabela indexada por extensão, em minúsculas
+
+    Retorna:
+        A entrada encontrada ou None
+    """
+    stem, _, ext = save_path.lower().rpartition(".")
+    compound = "." + stem.rpartition(".")[2] + "." + ext
+    return table.get(compound) or table.get("." + ext)
+
+
+def read_head(chunks: Iterator[bytes], size: int = HEAD_SIZE) -> bytes:
+    """
+    Junta os primeiros blocos da resposta até ter ao menos `size` bytes.
+
+    Com Transfer-Encoding: chunked, cada bloco de iter_content pode ter
+    apenas alguns bytes; a validação precisa do início completo do arquivo.
+
+    Parâmetros:
+        chunks (iterator): Blocos da resposta (os seguintes continuam nele)
+        size (int): Número mínimo de bytes a acumular
+
+    Retorna:
+        bytes: Início do conteúdo (menor que `size` só se a resposta terminar antes)
+    """
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= size:
+            break
+    return head
+
+
+# ==============================================
+# Sessão HTTP, novas tentativas e circuit breaker
+# ==============================================
+
+
+class JitterRetry(Retry):
+    """
+    Política de novas tentativas do urllib3 com variação aleatória (jitter).
+
+    A espera antes da n-ésima nova tentativa é backoff_factor * 2^(n-1),
+    multiplicada por um fator aleatório de até 1.5 e limitada a MAX_BACKOFF
+    segundos. Ao contrário do urllib3, que não espera antes da primeira nova
+    tentativa, todas as tentativas esperam. O cabeçalho Retry-After
+    também é limitado a MAX_BACKOFF, para que um servidor não prenda a
+    thread por horas.
+    """
+
+    def get_backoff_time(self) -> float:
+        # Falhas seguidas, ignorando redirecionamentos (como no urllib3)
+        errors = sum(
+            1
+            for _ in itertools.takewhile(
+                lambda h: h.redirect_location is None, reversed(self.history)
+            )
+        )
+        if errors == 0:
+            return 0
+        delay = self.backoff_factor * 2 ** (errors - 1) * (1 + 0.5 * random.random())
+        return min(MAX_BACKOFF, delay)
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(MAX_BACKOFF, retry_after)
+
+
+def host_is_blocked(host: str) -> bool:
+    """
+    Verifica se o servidor está temporariamente bloqueado pelo circuit breaker.
+
+    Parâmetros:
+        host (str): Servidor (ex: m3u4u.com)
+
+    Retorna:
+        bool: True se os downloads deste servidor devem falhar imediatamente
+    """
+    with _breaker_lock:
+        state = _breaker.get(host)
+        return state is not None and time.time() < state["open_until"]
+
+
+def record_host_result(host: str, success: bool) -> None:
+    """
+    Registra o resultado de uma tentativa no circuit breaker do servidor.
+
+    Após BREAKER_THRESHOLD falhas seguidas, o servidor fica bloqueado por
+    BREAKER_COOLDOWN segundos; um sucesso zera a contagem.
+
+    Parâmetros:
+        host (str): Servidor (ex: m3u4u.com)
+        success (bool): True se a tentativa foi bem-sucedida
+    """
+    with _breaker_lock:
+        state = _breaker.setdefault(host, {"fails": 0, "open_until": 0})
+        if success:
+            state["fails"] = 0
+            return
+        state["fails"] += 1
+        if state["fails"] >= BREAKER_THRESHOLD:
+            state["open_until"] = time.time() + BREAKER_COOLDOWN
+            logger.warning(
+                "Servidor %s bloqueado por %ds após %d falhas seguidas",
+                host,
+                BREAKER_COOLDOWN,
+                state["fails"],
+            )
+
+
+def install_dns_cache() -> None:
+    """
+    Instala um cache de DNS em memória no lugar de socket.getaddrinfo.
+
+    Cada host é resolvido apenas uma vez por execução, mesmo quando várias
+    threads abrem a primeira conexão ao mesmo tempo. Somente resoluções
+    bem-sucedidas são armazenadas.
+    """
+    original_getaddrinfo = socket.getaddrinfo
+    if getattr(original_getaddrinfo, "dns_cache", False):
+        return  # Cache já instalado
+
+    cache = {}
+    key_locks: Dict[tuple, threading.Lock] = defaultdict(threading.Lock)
+    lock = threading.Lock()
+
+    def cached_getaddrinfo(host, port, *args, **kwargs):
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        with lock:
+            if key in cache:
+                return cache[key]
+            key_lock = key_locks[key]
+        # Um lock por host: uma thread resolve e as demais aguardam o
+        # resultado, sem bloquear a resolução de outros hosts
+        with key_lock:
+            with lock:
+                if key in cache:
+                    return cache[key]
+            result = original_getaddrinfo(host, port, *args, **kwargs)
+            with lock:
+                cache[key] = result
+        return result
+
+    cached_getaddrinfo.dns_cache = True
+    socket.getaddrinfo = cached_getaddrinfo
+
+
+def create_session(
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF,
+    headers: Optional[Dict[str, str]] = None,
+) -> requests.Session:
+    """
+    Cria uma sessão HTTP compartilhada entre todos os downloads.
+
+    A sessão reutiliza conexões (keep-alive) para arquivos do mesmo servidor,
+    evitando um novo handshake TCP+TLS a cada download, e refaz no próprio
+    pool as requisições que falharem, respeitando o cabeçalho Retry-After.
+
+    Parâmetros:
+        max_workers (int): Número de threads que usarão a sessão simultaneamente
+        retries (int): Número de tentativas (a primeira e as novas tentativas)
+        backoff_factor (float): Tempo base de espera entre tentativas
+        headers (dict): Cabeçalhos HTTP (padrão: DEFAULT_HEADERS)
+
+    Retorna:
+        requests.Session: Sessão configurada com os cabeçalhos informados
+    """
+    session = requests.Session()
+    retry = JitterRetry(
+        total=retries - 1,  # Novas tentativas, além da primeira
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=8, pool_maxsize=max_workers, max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS if headers is None else headers)
+    return session
+
+
+def session_with_retry(session: requests.Session, retry: Retry) -> requests.Session:
+    """
+    Cria uma sessão com os cabeçalhos de `session` e o saldo de tentativas `retry`.
+
+    Usada para refazer um download interrompido durante a leitura do corpo
+    sem renovar o limite de tentativas do pool: as falhas da nova requisição
+    contam contra o mesmo saldo.
+
+    Parâmetros:
+        session (requests.Session): Sessão de onde os cabeçalhos são copiados
+        retry (Retry): Estado das tentativas já feitas para o arquivo
+
+    Retorna:
+        requests.Session: Sessão com uma única conexão
+    """
+    retry_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+    retry_session.mount("http://", adapter)
+    retry_session.mount("https://", adapter)
+    retry_session.headers.update(session.headers)
+    return retry_session
+
+
+# ==============================================
+# Cache de validação (requisições condicionais)
+# ==============================================
+
+
+def load_cache(path: str) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Carrega o cache de validação (ETag/Last-Modified) dos downloads anteriores.
+
+    Parâmetros:
+        path (str): Caminho do arquivo de cache
+
+    Retorna:
+        dict: {nome_do_arquivo: {"etag", "last_modified", "md5"}} ou {} se não existir
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        # Cache corrompido: ignora e baixa tudo novamente
+        logger.warning("Cache inválido em %s, ignorando: %s", path, e)
+        return {}
+
+
+def save_cache(path: str, cache: Dict[str, Dict[str, Optional[str]]]) -> None:
+    """
+    Grava o cache de validação para ser usado na próxima execução.
+
+    Parâmetros:
+        path (str): Caminho do arquivo de cache
+        cache (dict): Dados de validação de cada arquivo
+    """
+    try:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, indent=2, sort_keys=True)
+    except OSError as e:
+        logger.error("Erro ao salvar cache %s: %s", path, e)
+
+
+def conditional_headers(
+    save_path: str, cache: Optional[Dict[str, Dict[str, Optional[str]]]]
+) -> Dict[str, str]:
+    """
+    Monta os cabeçalhos de requisição condicional para um arquivo já baixado.
+
+    Parâmetros:
+        save_path (str): Caminho local do arquivo
+        cache (dict): Dados de validação dos downloads anteriores (ou None)
+
+    Retorna:
+        dict: Cabeçalhos If-None-Match/If-Modified-Since (vazio se não houver cache)
+    """
+    entry = cache.get(os.path.basename(save_path)) if cache is not None else None
+    # Sem o arquivo local não há o que reaproveitar
+    if not entry or not os.path.exists(save_path):
+        return {}
+
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+# ==============================================
+# Hash MD5 em thread separada
+# ==============================================
+
+
+def _hash_loop() -> None:
+    """
+    Consome a fila de hash. Cada item é uma tupla (hasher, bloco, future):
+    itens com bloco atualizam o MD5; o item final (bloco None) devolve no
+    future o hash, ou o erro ocorrido em algum bloco daquele hasher.
+    """
+    errors: Dict[Any, Exception] = {}
+    while True:
+        hasher, chunk, future = _hash_queue.get()
+        try:
+            if chunk is not None:
+                if hasher not in errors:
+                    hasher.update(chunk)
+            elif hasher in errors:
+                future.set_exception(errors.pop(hasher))
+            else:
+                future.set_result(hasher.hexdigest())
+        except Exception as e:
+            # Mantém a thread viva: o erro é entregue a quem aguarda o hash
+            if chunk is None:
+                future.set_exception(e)
+            else:
+                errors[hasher] = e
+
+
+def _start_hash_thread() -> None:
+    """
+    Inicia a thread de hash na primeira utilização.
+    """
+    global _hash_thread
+    if _hash_thread is not None:
+        return  # Caminho comum, sem lock
+    with _hash_thread_lock:
+        if _hash_thread is None:
+            _hash_thread = threading.Thread(target=_hash_loop, daemon=True)
+            _hash_thread.start()
+
+
+def hash_chunk(hasher, chunk: bytes) -> None:
+    """
+    Envia um bloco para ser somado ao hash MD5 na thread de hash.
+
+    md5().update() libera o GIL para blocos grandes, então a thread de
+    download continua lendo a rede enquanto o hash é calculado.
+
+    Parâmetros:
+        hasher: Objeto md5() do arquivo sendo baixado
+        chunk (bytes): Bloco recebido do servidor
+    """
+    _start_hash_thread()
+    _hash_queue.put((hasher, chunk, None))
+
+
+def hash_result(hasher) -> str:
+    """
+    Aguarda a thread de hash processar todos os blocos enviados.
+
+    Parâmetros:
+        hasher: Objeto md5() usado em hash_chunk
+
+    Retorna:
+        str: Hash MD5 (hexadecimal) do arquivo
+
+    Levanta:
+        Exception: O erro ocorrido ao calcular o hash, se houver
+    """
+    future: Future = Future()
+    _start_hash_thread()
+    _hash_queue.put((hasher, None, future))
+    return future.result()
+
+
+# ==============================================
+# Função principal de download
+# ==============================================
+
+
+def download_file(
+    url: str,
+    save_path: str,
+    session: requests.Session,
+    timeout: int = DEFAULT_TIMEOUT,
+    validators: Dict[str, Callable[[bytes], bool]] = VALIDATORS,
+    cache: Optional[Dict[str, Dict[str, Optional[str]]]] = None,
+) -> bool:
+    """
+    Faz o download de um arquivo com tratamento de erros.
+
+    As novas tentativas (falhas de conexão e respostas 429/5xx) são feitas
+    pela própria sessão, no pool de conexões (ver create_session). Uma
+    conexão interrompida durante a leitura do corpo refaz a requisição;
+    todas as tentativas do arquivo, de qualquer tipo, somam no mesmo limite.
+
+    Parâmetros:
+        url (str): Endereço do arquivo a ser baixado
+        save_path (str): Caminho local para salvar o arquivo
+        session (requests.Session): Sessão HTTP compartilhada entre os downloads
+        timeout (int): Tempo limite da requisição em segundos
+        validators (dict): Validadores do início do conteúdo, por extensão
+        cache (dict): Cache de validação; se informado, evita baixar arquivos
+            que não mudaram no servidor (resposta 304) e é atualizado após o download
+
+    Retorna:
+        bool: True se o download foi bem-sucedido, False caso contrário
+
+    Levanta:
+        InvalidURLError: Se a URL for inválida
+    """
+    # Validação inicial da URL
+    if not validate_url(url):
+        error_msg = f"URL inválida: {url}"
+        logger.error(error_msg)
+        raise InvalidURLError(error_msg)
+
+    host = urlparse(url).netloc
+    # Validações definidas uma única vez, pela extensão do arquivo
+    is_valid_content = lookup_by_extension(save_path, validators)
+    check_file = lookup_by_extension(save_path, FILE_CHECKS)
+    # Grava em arquivo temporário; a cópia anterior só é substituída
+    # após todas as verificações
+    tmp_path = save_path + ".tmp"
+
+    # Falha imediatamente se o servidor estiver bloqueado
+    if host_is_blocked(host):
+        logger.error("Servidor %s indisponível, ignorando: %s", host, url)
+        return False
+
+    http = session  # Sessão da requisição atual (ver session_with_retry)
+    try:
+        logger.debug("Baixando de: %s", url)
+
+        # O urllib3 só refaz a requisição até o recebimento dos cabeçalhos;
+        # uma interrupção durante a leitura do corpo refaz a requisição por
+        # uma sessão que continua o mesmo saldo de tentativas (e backoff)
+        http = session
+        while True:
+            # Faz a requisição HTTP com timeout, lendo o corpo em blocos
+            # (condicional, se o arquivo já foi baixado anteriormente)
+            with http.get(
+                url,
+                headers=conditional_headers(save_path, cache),
+                timeout=timeout,
+                stream=True,
+            ) as response:
+                # Arquivo não mudou no servidor: mantém a cópia local
+                if response.status_code == 304:
+                    record_host_result(host, True)
+                    logger.info("Sem alterações: %s", save_path)
+                    return True
+
+                # Verifica código de status HTTP
+                if response.status_code != 200:
+                    error_msg = f"Falha ao baixar {url}. Código: {response.status_code}"
+                    logger.error(error_msg)
+                    # Erros 4xx indicam problema no arquivo, não no servidor
+                    if response.status_code >= 500:
+                        record_host_result(host, False)
+                    raise DownloadError(error_msg)
+
+                try:
+                    # Valida o início do conteúdo conforme a extensão, antes
+                    # de gravar
+                    chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+                    head = read_head(chunks)
+                    if is_valid_content and not is_valid_content(head):
+                        error_msg = f"Conteúdo inválido para {save_path}: {url}"
+                        logger.error(error_msg)
+                        raise FileValidationError(error_msg)
+
+                    # Grava os blocos à medida que chegam; o hash MD5 é
+                    # calculado na mesma passagem, pela thread de hash.
+                    # iter_content já lê direto de response.raw (com
+                    # decode_content). Cópia sem passar pelo Python (sendfile)
+                    # não se aplica: no Linux os.sendfile não lê de sockets, e
+                    # o MD5 e a descompactação do Content-Encoding precisam
+                    # dos bytes em memória
+                    hasher = md5()
+                    with open(tmp_path, "wb") as file:
+                        for chunk in itertools.chain((head,), chunks):
+                            if chunk:  # Filtra chunks keep-alive
+                                hash_chunk(hasher, chunk)
+                                file.write(chunk)
+                    file_hash = hash_result(hasher)
+                    break
+                except BODY_READ_ERRORS as e:
+                    try:
+                        # Tentativas já feitas pelo pool nesta requisição
+                        # mais a interrupção atual
+                        retry = response.raw.retries.increment(
+                            method="GET", url=url, error=e
+                        )
+                    except MaxRetryError:
+                        raise e from None  # Tentativas esgotadas
+                    logger.warning(
+                        "Conexão interrompida ao baixar %s, nova tentativa: %s", url, e
+                    )
+            # Aguarda o backoff (com jitter) fora do bloco, com a conexão liberada
+            retry.sleep()
+            if http is not session:
+                http.close()
+            http = session_with_retry(session, retry)
+
+        # Verificação pós-download
+        if os.path.getsize(tmp_path) == 0:
+            error_msg = f"Arquivo vazio: {save_path}"
+            logger.error(error_msg)
+            raise DownloadError(error_msg)
+
+        # Verificação adicional do arquivo completo (ex: .gz sem conteúdo)
+        if check_file and not check_file(tmp_path):
+            error_msg = f"Arquivo inválido: {save_path}"
+            logger.error(error_msg)
+            raise FileValidationError(error_msg)
+
+        # Substitui a cópia anterior de forma atômica
+        os.replace(tmp_path, save_path)
+
+        # Guarda os validadores para a próxima execução
+        if cache is not None:
+            cache[os.path.basename(save_path)] = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "md5": file_hash,
+            }
+
+        # Log de sucesso
+        record_host_result(host, True)
+        file_size = os.path.getsize(save_path)
+        logger.info("Download concluído: %s (%d bytes)", save_path, file_size)
+
+        # Hash MD5 para verificação de integridade
+        logger.info("Hash MD5 do arquivo: %s", file_hash)
+
+        return True
+
+    except Exception as e:
+        logger.error("Falha ao baixar %s: %s", url, e)
+        # Falhas de conexão e timeouts (após as novas tentativas da sessão)
+        # contam contra o servidor
+        if isinstance(e, requests.exceptions.RequestException):
+            record_host_result(host, False)
+        return False
+    finally:
+        if http is not session:
+            http.close()
+        # Remove o arquivo temporário de um download que falhou
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def link_copies(source_path: str, copy_paths: List[str]) -> List[bool]:
+    """
+    Cria cópias de um arquivo baixado usando hardlinks (sem novo download).
+
+    Usada quando a mesma URL aparece para mais de um arquivo: os links
+    compartilham o mesmo conteúdo em disco.
+
+    Parâmetros:
+        source_path (str): Arquivo já baixado
+        copy_paths (list): Caminhos que devem ter o mesmo conteúdo
+
+    Retorna:
+        list: Resultado (True/False) de cada cópia, na mesma ordem
+    """
+    results = []
+    for copy_path in copy_paths:
+        # Já é um link para o arquivo atual: nada a fazer
+        if os.path.exists(copy_path) and os.path.samefile(source_path, copy_path):
+            results.append(True)
+            continue
+        tmp_path = copy_path + ".tmp"
+        try:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            os.link(source_path, tmp_path)
+            os.replace(tmp_path, copy_path)
+            logger.info("Cópia criada: %s -> %s", copy_path, source_path)
+            results.append(True)
+        except OSError as e:
+            logger.error("Erro ao criar cópia %s: %s", copy_path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            results.append(False)
+    return results
+
+
+def download_host_files(
+    items: List[Tuple[str, List[str]]],
+    session: requests.Session,
+    timeout: int = DEFAULT_TIMEOUT,
+    validators: Dict[str, Callable[[bytes], bool]] = VALIDATORS,
+    cache: Optional[Dict[str, Dict[str, Optional[str]]]] = None,
+) -> List[bool]:
+    """
+    Baixa, em sequência, todos os arquivos de um mesmo servidor.
+
+    Executar os arquivos de um servidor na mesma thread garante que a
+    conexão keep-alive da sessão seja reaproveitada entre eles.
+
+    Parâmetros:
+        items (list): Lista de tuplas (url, [caminhos_locais]) do mesmo servidor;
+            cada URL é baixada uma vez no primeiro caminho e ligada aos demais
+        session (requests.Session): Sessão HTTP compartilhada entre os downloads
+        timeout (int): Tempo limite da requisição em segundos
+        validators (dict): Validadores do início do conteúdo, por extensão
+        cache (dict): Cache de validação (ver download_file)
+
+    Retorna:
+        list: Resultado (True/False) de cada arquivo, na mesma ordem
+    """
+    results = []
+    for url, save_paths in items:
+        first_path, copy_paths = save_paths[0], save_paths[1:]
+        try:
+            success = download_file(
+                url, first_path, session, timeout, validators, cache
+            )
+        except Exception as e:
+            logger.error("Erro durante o download de %s: %s", url, e)
+            success = False
+        results.append(success)
+        if success:
+            results.extend(link_copies(first_path, copy_paths))
+        else:
+            results.extend(False for _ in copy_paths)
+    return results
+
+
+def download_all(
+    files_config: Dict[str, Dict[str, str]],
+    output_dir: str,
+    workers: int = DEFAULT_MAX_WORKERS,
+    validators: Dict[str, Callable[[bytes], bool]] = VALIDATORS,
+    session_options: Optional[Dict[str, Any]] = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    cache: Optional[Dict[str, Dict[str, Optional[str]]]] = None,
+) -> Tuple[int, int]:
+    """
+    Baixa todos os arquivos configurados, em paralelo por servidor.
+
+    Parâmetros:
+        files_config (dict): {tipo: {nome_do_arquivo: url}}
+        output_dir (str): Diretório onde os arquivos serão salvos
+        workers (int): Número máximo de threads paralelas
+        validators (dict): Validadores do início do conteúdo, por extensão
+        session_options (dict): Argumentos extras de create_session
+            (retries, backoff_factor, headers)
+        timeout (int): Tempo limite da requisição em segundos
+        cache (dict): Cache de validação (ver download_file)
+
+    Retorna:
+        tuple: (sucessos, falhas)
+    """
+    success_count = 0
+    failure_count = 0
+
+    # Resolve cada host uma única vez durante a execução
+    install_dns_cache()
+
+    # Agrupa os arquivos por URL, para que cada URL seja baixada uma vez
+    url_to_paths = defaultdict(list)
+    for files in files_config.values():
+        for filename, url in files.items():
+            url_to_paths[url].append(os.path.join(output_dir, filename))
+
+    # Agrupa os downloads por servidor: {host: [(url, [caminhos]), ...]}
+    by_host = defaultdict(list)
+    for url, save_paths in url_to_paths.items():
+        by_host[urlparse(url).netloc].append((url, save_paths))
+
+    # Uma thread por servidor (limitado a workers): threads extras
+    # apenas disputariam as conexões do mesmo servidor
+    workers = max(1, min(workers, len(by_host)))
+
+    # Sessão HTTP única, com o pool de conexões do tamanho do pool de threads
+    session = create_session(workers, **(session_options or {}))
+
+    # Usa ThreadPool para downloads paralelos; cada thread baixa os arquivos
+    # do seu servidor em sequência, reaproveitando a mesma conexão
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                download_host_files, items, session, timeout, validators, cache
+            )
+            for items in by_host.values()
+        ]
+
+        # Processa os resultados conforme cada servidor termina
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+                success_count += results.count(True)
+                failure_count += results.count(False)
+            except Exception as e:
+                logger.error("Erro durante o download: %s", e)
+                failure_count += 1
+
+    return success_count, failure_count
+
+
+def run(config: Dict[str, Any]) -> bool:
+    """
+    Executa o processo completo de download a partir de uma configuração.
+
+    Parâmetros:
+        config (dict): Configuração do script:
+            files (dict): {tipo: {nome_do_arquivo: url}}
+            output_dir (str): Diretório onde os arquivos serão salvos
+            max_workers (int): Número máximo de threads (opcional)
+            timeout (int): Tempo limite das requisições (opcional)
+            retries (int): Número de tentativas por download (opcional)
+            backoff_factor (float): Tempo base entre tentativas (opcional)
+            headers (dict): Cabeçalhos HTTP (opcional)
+            validators (dict): Validadores por extensão (opcional)
+            cache_file (str): Cache de ETag/Last-Modified; se omitido, as
+                requisições condicionais não são usadas (opcional)
+
+    Retorna:
+        bool: True se todos os downloads foram bem-sucedidos, False caso contrário
+    """
+    output_dir = config["output_dir"]
+
+    # Cria o diretório de saída se não existir (os arquivos existentes são
+    # mantidos e só substituídos quando o novo download for concluído)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Validadores (ETag/Last-Modified) da execução anterior
+    cache_file = config.get("cache_file")
+    cache = load_cache(cache_file) if cache_file else None
+
+    logger.info("Iniciando downloads...")
+
+    session_options = {
+        "retries": config.get("retries", DEFAULT_RETRIES),
+        "backoff_factor": config.get("backoff_factor", DEFAULT_BACKOFF),
+        "headers": config.get("headers", DEFAULT_HEADERS),
+    }
+    success_count, failure_count = download_all(
+        config["files"],
+        output_dir,
+        config.get("max_workers", DEFAULT_MAX_WORKERS),
+        config.get("validators", VALIDATORS),
+        session_options,
+        config.get("timeout", DEFAULT_TIMEOUT),
+        cache,
+    )
+
+    # Salva o cache mesmo em caso de falhas parciais
+    if cache_file:
+        save_cache(cache_file, cache)
+
+    # Log final com estatísticas
+    logger.info(
+        "Downloads concluídos. Sucessos: %d, Falhas: %d", success_count, failure_count
+    )
+
+    # Verifica se houve falhas
+    if failure_count > 0:
+        logger.warning("Atenção: %d arquivos falharam no download", failure_count)
+        return False
+    return True